@@ -0,0 +1,134 @@
+"""
+Caching helpers shared by the analysis scripts.
+
+Covers the input fingerprints and run memos that let a script skip work when
+nothing changed, the binary copy of the yearly aggregates, and the Parquet
+cache of the ASOS daily CSV.
+"""
+
+import hashlib
+import json
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pyarrow import csv as pacsv
+from pathlib import Path
+
+# Column types for the ASOS daily CSV. Air and feels-like temperatures only
+# feed threshold counts, so float32 is ample; dew point, humidity and wind are
+# averaged per year and stay float64 so the means match the CSV exactly.
+ASOS_COLUMN_TYPES = {
+    "date": pa.timestamp("s"),
+    **{
+        f"{var}_{stat}": pa.float32() if var in ("tmpf", "feel") else pa.float64()
+        for var in ("tmpf", "dwpf", "relh", "sknt", "gust", "feel")
+        for stat in ("max", "min", "mean")
+    },
+}
+
+# Helper modules whose code feeds every analysis result
+SHARED_SOURCES = [Path(__file__), Path(__file__).with_name("_stats.py")]
+
+
+def fingerprint(path):
+    """
+    Fast content fingerprint of a file.
+
+    Hashes the file size and modification time plus its first and last
+    64 KiB. The mtime catches same-length edits in the middle of the file
+    (such as a single re-fetched value) without reading the whole file.
+    """
+    st = path.stat()
+    size = st.st_size
+    digest = hashlib.blake2b(size.to_bytes(8, "little"), digest_size=16)
+    digest.update(st.st_mtime_ns.to_bytes(8, "little"))
+    with open(path, "rb") as f:
+        digest.update(f.read(65536))
+        if size > 65536:
+            f.seek(max(size - 65536, 65536))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def fingerprint_code(script):
+    """Fingerprint an analysis script together with the shared helper modules."""
+    return "".join(fingerprint(p) for p in [Path(script), *SHARED_SOURCES])
+
+
+def is_up_to_date(memo_file, input_hash):
+    """Check whether the last run used the same inputs and its outputs still exist."""
+    if not memo_file.exists():
+        return False
+    memo = json.loads(memo_file.read_text())
+    return (
+        memo.get("input_hash") == input_hash
+        and all(Path(p).exists() for p in memo.get("outputs", []))
+    )
+
+
+def write_memo(memo_file, input_hash, outputs):
+    """Record the inputs and outputs of a successful run."""
+    memo = {"input_hash": input_hash, "outputs": [str(p) for p in outputs]}
+    memo_file.write_text(json.dumps(memo, indent=2))
+
+
+def load_cached_aggregate(aggregate_file, input_hash, input_file):
+    """
+    Return the saved yearly counts if they were computed from the same inputs.
+
+    Both the fingerprint and the input's modification time recorded in the
+    .meta sidecar must match, so an input rewritten since the counts were
+    saved is never served from the cache.
+    """
+    meta_file = aggregate_file.with_suffix(".meta")
+    if not aggregate_file.exists() or not meta_file.exists():
+        return None
+    meta = json.loads(meta_file.read_text())
+    if (
+        meta.get("hash") != input_hash
+        or meta.get("input_mtime_ns") != input_file.stat().st_mtime_ns
+    ):
+        return None
+
+    print(f"\nUsing cached yearly counts: {aggregate_file}")
+    return pd.read_parquet(aggregate_file, engine="pyarrow")
+
+
+def save_aggregate(df, aggregate_file, input_hash, input_file):
+    """Save yearly counts in binary form, with a .meta sidecar holding the input fingerprint and mtime."""
+    df.to_parquet(aggregate_file, engine="pyarrow")
+    meta = {"hash": input_hash, "input_mtime_ns": input_file.stat().st_mtime_ns}
+    aggregate_file.with_suffix(".meta").write_text(json.dumps(meta))
+
+
+def load_cached_asos(csv_path, columns=None):
+    """
+    Load the ASOS daily CSV through a Parquet copy cached next to it.
+
+    The Parquet file is rebuilt whenever the CSV is newer (or predates a
+    requested column), and stores year/month/day columns so the analysis
+    never has to touch the timestamps.
+    """
+    parquet_path = csv_path.with_suffix(".parquet")
+    if (
+        parquet_path.exists()
+        and parquet_path.stat().st_mtime >= csv_path.stat().st_mtime
+        and set(columns or []) <= set(pq.read_schema(parquet_path).names)
+    ):
+        return pd.read_parquet(parquet_path, columns=columns, engine="pyarrow")
+
+    # Parse with Arrow's multithreaded CSV reader and hand the columns to pandas
+    # without an intermediate copy
+    table = pacsv.read_csv(
+        csv_path,
+        convert_options=pacsv.ConvertOptions(column_types=ASOS_COLUMN_TYPES),
+    )
+    # Derive the calendar fields in Arrow, straight from the timestamp column
+    table = table.append_column("year", pc.year(table["date"]).cast(pa.int16()))
+    table = table.append_column("month", pc.month(table["date"]).cast(pa.int8()))
+    table = table.append_column("day", pc.day(table["date"]).cast(pa.int8()))
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    df.to_parquet(parquet_path, engine="pyarrow", compression="zstd")
+
+    return df[columns] if columns is not None else df
@@ -0,0 +1,114 @@
+"""
+Yearly counting and trend fitting shared by the analysis scripts.
+"""
+
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+from scipy import special
+
+# Year axis shared by the trend fits and the plots (see make_year_ctx)
+YearCtx = namedtuple("YearCtx", ["years", "x_centered", "x_sumsq"])
+
+
+def date_range(df):
+    """Return the first and last dates in df as ISO strings, from its year/month/day columns."""
+    ymd = (
+        df["year"].to_numpy(dtype=np.int32) * 10000
+        + df["month"].to_numpy(dtype=np.int32) * 100
+        + df["day"].to_numpy(dtype=np.int32)
+    )
+    first, last = ymd.min(), ymd.max()
+    return (
+        f"{first // 10000}-{first // 100 % 100:02d}-{first % 100:02d}",
+        f"{last // 10000}-{last // 100 % 100:02d}-{last % 100:02d}",
+    )
+
+
+def count_by_year(year_vals, masks):
+    """
+    Count True rows per year for each column of a (rows, k) boolean matrix.
+
+    When the rows are in chronological order each year is a contiguous run,
+    so all k columns are summed with one np.add.reduceat over the run starts.
+    Otherwise the years are factorized and tallied in a single bincount over
+    year_code * k + column.
+
+    Returns:
+        (years, counts, rows_per_year): sorted unique years, an (n_years, k)
+        int32 array of counts, and the number of rows for each year
+    """
+    steps = np.diff(year_vals)
+    if len(year_vals) > 0 and (steps >= 0).all():
+        starts = np.concatenate(([0], np.flatnonzero(steps) + 1))
+        years = year_vals[starts]
+        counts = np.add.reduceat(masks, starts, axis=0, dtype=np.int32)
+        rows_per_year = np.diff(np.append(starts, len(year_vals)))
+        return years, counts, rows_per_year
+
+    year_codes, years = pd.factorize(year_vals, sort=True)
+    n_years = len(years)
+    rows, cols = np.nonzero(masks)
+    k = masks.shape[1]
+    counts = np.bincount(year_codes[rows] * k + cols, minlength=n_years * k)
+    rows_per_year = np.bincount(year_codes, minlength=n_years)
+    return years, counts.reshape(n_years, k).astype(np.int32), rows_per_year
+
+
+def make_year_ctx(df):
+    """
+    Build the year axis shared by the trend fits and the plots.
+
+    Args:
+        df: DataFrame indexed by year
+
+    Returns:
+        YearCtx with int16 years, mean-centered years and their sum of squares
+    """
+    years = df.index.to_numpy(dtype=np.int16)
+    x_centered = years - years.mean()
+    return YearCtx(years, x_centered, x_centered @ x_centered)
+
+
+def calculate_trends_batch(ctx, Y):
+    """
+    Calculate linear trends for several series sharing the same years.
+
+    Closed-form least squares over all columns at once, reusing the
+    centered years and their sum of squares from the YearCtx.
+
+    Args:
+        ctx: YearCtx from make_year_ctx
+        Y: DataFrame with one column per series, rows aligned with ctx.years
+
+    Returns:
+        dict mapping column name to (slope, intercept, r_value, p_value)
+    """
+    y = Y.to_numpy(dtype=float)
+    n = len(ctx.years)
+
+    x_mean = ctx.years.mean()
+    y_mean = y.mean(axis=0)
+    xd = ctx.x_centered
+    yd = y - y_mean
+
+    sxx = ctx.x_sumsq
+    sxy = xd @ yd
+    syy = (yd ** 2).sum(axis=0)
+
+    slope = sxy / sxx
+    intercept = y_mean - slope * x_mean
+
+    # Same r and t-statistic formulation as scipy.stats.linregress
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_value = np.where(syy > 0, sxy / np.sqrt(sxx * syy), 0.0)
+    r_value = np.clip(r_value, -1.0, 1.0)
+    dof = n - 2
+    t_stat = r_value * np.sqrt(dof / ((1.0 - r_value + 1e-20) * (1.0 + r_value + 1e-20)))
+    # Two-sided p-value straight from the Student t CDF ufunc
+    p_value = 2.0 * special.stdtr(dof, -np.abs(t_stat))
+
+    return {
+        col: (slope[i], intercept[i], r_value[i], p_value[i])
+        for i, col in enumerate(Y.columns)
+    }
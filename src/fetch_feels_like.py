@@ -13,21 +13,69 @@ Station: SQL (San Carlos Airport, ~3.5 miles from Redwood City)
 Period: 1990-present
 """
 
+import sys
 import requests
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pacsv
 from pathlib import Path
 from datetime import datetime, timedelta
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 
 API_URL = "https://mesonet.agron.iastate.edu/cgi-bin/request/asos.py"
 STATION = "SQL"  # San Carlos Airport
 DATA_DIR = Path("data_raw")
 OUT_FILE = DATA_DIR / "asos_sql_hourly.csv"
+DAILY_FILE = DATA_DIR / "asos_sql_daily.csv"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# Measurement columns, parsed straight to floats ("null" / "M" mark missing values)
+NUMERIC_COLS = ["tmpf", "dwpf", "relh", "sknt", "gust", "feel"]
+NUMERIC_DTYPES = {col: "float64" for col in NUMERIC_COLS}
+NA_VALUES = ["null", "M", ""]
+
+# Arrow parse options for API responses: same types, timestamps kept as text
+RESPONSE_CONVERT_OPTIONS = pacsv.ConvertOptions(
+    column_types={"station": pa.string(), "valid": pa.string(),
+                  **{col: pa.float64() for col in NUMERIC_COLS}},
+    null_values=NA_VALUES,
+)
+
+# Daily statistics computed per measurement, saved as <col>_<stat> columns
+DAILY_STATS = {
+    "tmpf": ["max", "min", "mean"],
+    "dwpf": ["max", "min", "mean"],
+    "relh": ["max", "min", "mean"],
+    "sknt": ["max", "mean"],
+    "gust": ["max"],
+    "feel": ["max", "min", "mean"],
+}
+
 # Rate limiting: be respectful of the IEM service
-REQUEST_DELAY = 0.5  # 500ms between requests
+REQUEST_DELAY = 0.5  # 500ms between request starts (2 req/s), across all workers
+MAX_WORKERS = 4  # Concurrent monthly fetches, to overlap round trips
+
+# Shared keep-alive connection pool for all fetch threads
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS))
+
+_rate_lock = threading.Lock()
+_next_request_time = 0.0
+
+
+def _wait_for_request_slot():
+    """Block until this thread may start a request, keeping starts REQUEST_DELAY apart."""
+    global _next_request_time
+    with _rate_lock:
+        now = time.monotonic()
+        wait = _next_request_time - now
+        _next_request_time = max(now, _next_request_time) + REQUEST_DELAY
+    if wait > 0:
+        time.sleep(wait)
 
 
 def fetch_asos_data(start_date, end_date):
@@ -39,7 +87,7 @@ def fetch_asos_data(start_date, end_date):
         end_date: datetime object
 
     Returns:
-        pandas DataFrame with hourly observations
+        pyarrow Table with hourly observations
     """
     # Format dates for API (ISO format with UTC timezone)
     start_str = start_date.strftime("%Y-%m-%dT%H:%M+00:00")
@@ -47,7 +95,7 @@ def fetch_asos_data(start_date, end_date):
 
     params = {
         "station": STATION,
-        "data": ["tmpf", "dwpf", "relh", "sknt", "gust", "feel"],
+        "data": NUMERIC_COLS,
         "sts": start_str,
         "ets": end_str,
         "tz": "UTC",
@@ -56,17 +104,17 @@ def fetch_asos_data(start_date, end_date):
     }
 
     try:
-        # Add delay to be respectful
-        time.sleep(REQUEST_DELAY)
+        # Shared rate limit to be respectful
+        _wait_for_request_slot()
 
-        response = requests.get(API_URL, params=params, timeout=30)
+        response = SESSION.get(API_URL, params=params, timeout=30)
         response.raise_for_status()
 
-        # Parse CSV response
-        from io import StringIO
-        df = pd.read_csv(StringIO(response.text))
-
-        return df
+        # Parse CSV response bytes with Arrow; no per-month DataFrame is built
+        return pacsv.read_csv(
+            pa.BufferReader(response.content),
+            convert_options=RESPONSE_CONVERT_OPTIONS,
+        )
 
     except requests.exceptions.RequestException as e:
         print(f"Warning: Failed to fetch data for {start_date} to {end_date}: {e}")
@@ -88,100 +136,111 @@ def fetch_all_data(start_year=1990, end_year=None):
     print(f"Period: {start_year} to {end_year}")
     print(f"This will take several minutes due to rate limiting...")
 
-    all_data = []
-
-    # Fetch data month by month to avoid timeout issues
-    current_date = datetime(start_year, 1, 1)
-    end_date = datetime(end_year + 1, 1, 1)
-
-    # Calculate total months for progress bar
-    total_months = (end_year - start_year + 1) * 12
-
-    with tqdm(total=total_months, desc="Fetching months") as pbar:
-        while current_date < end_date:
-            # Calculate end of current month
-            if current_date.month == 12:
-                next_month = datetime(current_date.year + 1, 1, 1)
-            else:
-                next_month = datetime(current_date.year, current_date.month + 1, 1)
-
-            # Fetch data for this month
-            df = fetch_asos_data(current_date, next_month)
-
-            if df is not None and len(df) > 0:
-                all_data.append(df)
+    # Fetch data month by month to avoid timeout issues; consecutive month
+    # starts bound each request
+    boundaries = pd.date_range(
+        f"{start_year}-01-01", f"{end_year + 1}-01-01", freq="MS"
+    ).to_pydatetime()
+    months = list(zip(boundaries[:-1], boundaries[1:]))
 
-            # Move to next month
-            current_date = next_month
-            pbar.update(1)
+    # Fetch months concurrently; map() yields results in month order
+    all_data = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = executor.map(lambda month: fetch_asos_data(*month), months)
+        # Progress bar only on a terminal, redrawn at most every 5 s
+        progress = tqdm(results, total=len(months), desc="Fetching months",
+                        mininterval=5.0, disable=not sys.stderr.isatty())
+        for table in progress:
+            if table is not None and table.num_rows > 0:
+                all_data.append(table)
 
     if not all_data:
         raise RuntimeError("No data retrieved from ASOS API")
 
-    # Combine all monthly data
-    combined_df = pd.concat(all_data, ignore_index=True)
+    # Combine all monthly tables and convert to pandas once
+    combined_df = pa.concat_tables(all_data, promote_options="default").to_pandas(
+        self_destruct=True
+    )
 
     print(f"\nTotal hourly records fetched: {len(combined_df):,}")
 
     return combined_df
 
 
-def process_and_save(df):
+def save_hourly(df):
     """
-    Process hourly data and save to file.
+    Add date columns to freshly fetched hourly data and save it to file.
 
     Args:
-        df: DataFrame with hourly ASOS observations
+        df: DataFrame with hourly ASOS observations (modified in place)
     """
     print("\nProcessing hourly data...")
 
-    # Convert 'valid' column to datetime
-    df["datetime"] = pd.to_datetime(df["valid"])
-    df["date"] = df["datetime"].dt.date
-
-    # Replace 'null' strings with actual NaN
-    numeric_cols = ["tmpf", "dwpf", "relh", "sknt", "gust", "feel"]
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+    # Convert 'valid' column to datetime; IEM timestamps are "YYYY-MM-DD HH:MM",
+    # and a fixed format takes pandas' fast strptime path
+    try:
+        df["datetime"] = pd.to_datetime(df["valid"], format="%Y-%m-%d %H:%M", cache=True)
+    except ValueError:
+        df["datetime"] = pd.to_datetime(df["valid"], format="ISO8601")
+    # Midnight timestamps rather than datetime.date objects keep the groupby
+    # key a plain int64 column (and still save as YYYY-MM-DD)
+    df["date"] = df["datetime"].dt.floor("D")
 
     # Save hourly data
     df.to_csv(OUT_FILE, index=False)
     print(f"Saved hourly data: {OUT_FILE}")
 
+
+def aggregate_daily(df):
+    """
+    Aggregate hourly observations to daily statistics and save them.
+
+    Args:
+        df: DataFrame with hourly ASOS observations and a date column
+    """
     # Create daily aggregations
     print("\nCreating daily aggregations...")
 
-    daily_stats = df.groupby("date").agg({
-        "tmpf": ["max", "min", "mean"],
-        "dwpf": ["max", "min", "mean"],
-        "relh": ["max", "min", "mean"],
-        "sknt": ["max", "mean"],
-        "gust": "max",
-        "feel": ["max", "min", "mean"],
-    }).reset_index()
-
-    # Flatten column names
-    daily_stats.columns = ['_'.join(col).strip('_') for col in daily_stats.columns.values]
-    daily_stats.rename(columns={"date_": "date"}, inplace=True)
+    # Named aggregations produce the flat <col>_<stat> columns directly
+    daily_stats = df.groupby("date", as_index=False).agg(**{
+        f"{col}_{stat}": (col, stat)
+        for col, stats in DAILY_STATS.items()
+        for stat in stats
+    })
 
     # Save daily stats
-    daily_file = DATA_DIR / "asos_sql_daily.csv"
-    daily_stats.to_csv(daily_file, index=False)
-    print(f"Saved daily statistics: {daily_file}")
+    daily_stats.to_csv(DAILY_FILE, index=False)
+    print(f"Saved daily statistics: {DAILY_FILE}")
+
+    # Also write the Parquet copy the analysis scripts load (same schema as
+    # their cache), so they never have to parse the CSV
+    dates = pd.to_datetime(daily_stats["date"]).astype("datetime64[s]")
+    daily_cache = daily_stats.assign(
+        date=dates,
+        year=dates.dt.year.astype("int16"),
+        month=dates.dt.month.astype("int8"),
+        day=dates.dt.day.astype("int8"),
+    )
+    daily_cache = daily_cache.astype({
+        col: "float32" for col in daily_cache.columns if col.startswith(("tmpf_", "feel_"))
+    })
+    daily_parquet = DAILY_FILE.with_suffix(".parquet")
+    daily_cache.to_parquet(daily_parquet, engine="pyarrow", compression="zstd", index=False)
+    print(f"Saved daily statistics: {daily_parquet}")
 
     # Print summary
     print("\nData summary:")
-    print(f"  Date range: {df['date'].min()} to {df['date'].max()}")
+    print(f"  Date range: {dates.min().date()} to {dates.max().date()}")
     print(f"  Total days: {len(daily_stats)}")
-    print(f"  Temperature range: {df['tmpf'].min():.1f}°F to {df['tmpf'].max():.1f}°F")
-    print(f"  'Feels like' range: {df['feel'].min():.1f}°F to {df['feel'].max():.1f}°F")
+    ranges = df[["tmpf", "feel"]].agg(["min", "max"])
+    print(f"  Temperature range: {ranges.at['min', 'tmpf']:.1f}°F to {ranges.at['max', 'tmpf']:.1f}°F")
+    print(f"  'Feels like' range: {ranges.at['min', 'feel']:.1f}°F to {ranges.at['max', 'feel']:.1f}°F")
 
     # Data completeness
-    for col in ["tmpf", "feel", "relh", "sknt"]:
-        if col in df.columns:
-            missing_pct = (df[col].isna().sum() / len(df)) * 100
-            print(f"  {col} missing: {missing_pct:.1f}%")
+    completeness_cols = [col for col in ["tmpf", "feel", "relh", "sknt"] if col in df.columns]
+    missing = df[completeness_cols].isna().mean() * 100
+    for col, missing_pct in missing.items():
+        print(f"  {col} missing: {missing_pct:.1f}%")
 
     return daily_stats
 
@@ -199,15 +258,25 @@ def main():
         response = input("Re-fetch data from server? This will take several minutes. (y/N): ")
         if response.lower() != 'y':
             print("Using existing data. Delete the file to force re-fetch.")
-            df = pd.read_csv(OUT_FILE)
-            process_and_save(df)
+
+            # Daily statistics newer than the hourly data are already current
+            if DAILY_FILE.exists() and DAILY_FILE.stat().st_mtime >= OUT_FILE.stat().st_mtime:
+                print(f"Daily statistics are up to date: {DAILY_FILE}")
+                return
+
+            # The saved hourly file already has its date column; only re-aggregate
+            df = pd.read_csv(
+                OUT_FILE, dtype=NUMERIC_DTYPES, na_values=NA_VALUES, engine="pyarrow"
+            )
+            aggregate_daily(df)
             return
 
     # Fetch all data
     df = fetch_all_data(start_year=1990)
 
     # Process and save
-    process_and_save(df)
+    save_hourly(df)
+    aggregate_daily(df)
 
     print("\n" + "=" * 70)
     print("ASOS data fetch complete!")
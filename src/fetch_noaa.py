@@ -9,12 +9,22 @@ This script:
 """
 
 import os
+import io
+import gzip
 import json
+import threading
 import time
+import shutil
 import requests
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 from pathlib import Path
 from datetime import date
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from tqdm import tqdm
 from dotenv import load_dotenv
 
@@ -22,12 +32,56 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Rate limiting: NOAA API allows 5 requests per second
-REQUEST_DELAY = 0.21  # 210ms between requests = ~4.7 requests/second
+REQUEST_DELAY = 0.21  # 210ms between request starts = ~4.7 requests/second
+MAX_WORKERS = 5  # Concurrent page requests, sharing the rate limit above
+PAGE_SIZE = 1000  # Maximum records per /data page
 
 BASE_URL = "https://www.ncdc.noaa.gov/cdo-web/api/v2"
 DATA_DIR = Path("data_raw")
-PAGES_DIR = DATA_DIR / "noaa_pages"
-PAGES_DIR.mkdir(parents=True, exist_ok=True)
+DATA_DIR.mkdir(parents=True, exist_ok=True)
+
+# Raw API pages, one compact JSON document per line, gzip-compressed; one log
+# per datatype, written through a 64 KiB buffer
+PAGE_LOG_NAME = "noaa_pages_{datatype}.ndjson.gz"
+PAGE_LOG_BUFFER = 1 << 16
+
+# Completed yearly chunks of an in-progress fetch, one Parquet shard each, so
+# an interrupted fetch resumes where it stopped (removed once the CSV is saved)
+CHUNK_DIR = DATA_DIR / "noaa_chunks"
+RECORD_SCHEMA = pa.schema([
+    ("date", pa.string()),
+    ("datatype", pa.string()),
+    ("station", pa.string()),
+    ("attributes", pa.string()),
+    ("value", pa.float64()),
+])
+
+# Station search result, reused for STATION_CACHE_DAYS before searching again
+STATION_INFO_FILE = DATA_DIR / "station_info.json"
+STATION_CACHE_DAYS = 30
+
+# Shared keep-alive connection pool for all requests; rate-limit (429) and
+# transient server errors are retried with exponential backoff
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=MAX_WORKERS,
+    pool_maxsize=MAX_WORKERS,
+    max_retries=Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]),
+))
+
+# Typed copy of the consolidated records for normalize.py: timestamps,
+# dictionary-encoded datatype, values kept as float64 °C
+RAW_SCHEMA = pa.schema([
+    ("date", pa.timestamp("s")),
+    ("datatype", pa.dictionary(pa.int8(), pa.string())),
+    ("station", pa.string()),
+    ("attributes", pa.string()),
+    ("value", pa.float64()),
+])
+
+_rate_lock = threading.Lock()
+_next_request_time = 0.0
+_print_lock = threading.Lock()
 
 
 def get_api_headers():
@@ -41,13 +95,104 @@ def get_api_headers():
     return {"token": token}
 
 
-def find_station():
+def _wait_for_request_slot():
+    """Block until this thread may start a request, keeping starts REQUEST_DELAY apart."""
+    global _next_request_time
+    with _rate_lock:
+        now = time.monotonic()
+        wait = _next_request_time - now
+        _next_request_time = max(now, _next_request_time) + REQUEST_DELAY
+    if wait > 0:
+        time.sleep(wait)
+
+
+def _report(message):
+    """Print a progress line from a fetch thread without interleaving it with another's."""
+    with _print_lock:
+        print(message)
+
+
+def _fetch_page(params):
+    """
+    Fetch one page of daily data.
+
+    Returns:
+        (raw response bytes, parsed JSON) tuple, or None if the request failed
+    """
+    # Shared rate limit across all fetch threads
+    _wait_for_request_slot()
+
+    try:
+        r = SESSION.get(f"{BASE_URL}/data", params=params, timeout=30)
+        r.raise_for_status()
+    except requests.exceptions.RequestException:
+        return None
+
+    # json parses the UTF-8 bytes directly, without decoding them to text first
+    return r.content, json.loads(r.content)
+
+
+def _result_count(page):
+    """Total record count reported with a first page (0 if the request failed)."""
+    if page is None:
+        return 0
+    data = page[1]
+    return data.get("metadata", {}).get("resultset", {}).get(
+        "count", len(data.get("results", []))
+    )
+
+
+def _save_chunk(pages, shard_file, page_log):
+    """
+    Log one chunk's pages and save its records as a Parquet shard.
+
+    The chunk ends at its first empty page. If any page failed, nothing is
+    logged or saved, so the chunk is fetched again on the next run.
+    """
+    if any(page is None for page in pages):
+        return
+
+    rows = []
+    for content, data in pages:
+        results = data.get("results", [])
+        if not results:
+            break
+
+        # Cache raw response bytes as-is (JSON newlines are only whitespace)
+        page_log.write(content.replace(b"\n", b"") + b"\n")
+
+        rows.extend(results)
+
+    pq.write_table(pa.Table.from_pylist(rows, schema=RECORD_SCHEMA), shard_file)
+
+
+def _load_station_info():
+    """Load the cached station search result and report which station it is."""
+    print(f"\nLoading cached station info from {STATION_INFO_FILE}")
+    with open(STATION_INFO_FILE) as f:
+        station = json.load(f)
+    print(f"Using station: {station['name']} ({station['id']})")
+    return station
+
+
+def find_station(force=False):
     """
     Find the NOAA GHCN-D station for Redwood City, CA.
 
+    A cached result younger than STATION_CACHE_DAYS is used without querying
+    the API, and an older one is still used if the API cannot be reached.
+
+    Args:
+        force: Search the API even if a fresh cached result exists
+
     Returns:
         dict: Station information including ID and date coverage
     """
+    if not force and STATION_INFO_FILE.exists():
+        cache_age = time.time() - STATION_INFO_FILE.stat().st_mtime
+        if cache_age < STATION_CACHE_DAYS * 86400:
+            return _load_station_info()
+
     print("Searching for Redwood City weather station...")
 
     # San Mateo County FIPS code is 06081
@@ -58,17 +203,15 @@ def find_station():
     }
 
     try:
-        r = requests.get(
-            f"{BASE_URL}/stations",
-            headers=get_api_headers(),
-            params=params,
-            timeout=30
-        )
+        r = SESSION.get(f"{BASE_URL}/stations", params=params, timeout=30)
         r.raise_for_status()
     except requests.exceptions.RequestException as e:
+        if STATION_INFO_FILE.exists():
+            print(f"Warning: Failed to query NOAA stations API ({e}); using cached station")
+            return _load_station_info()
         raise RuntimeError(f"Failed to query NOAA stations API: {e}")
 
-    data = r.json()
+    data = json.loads(r.content)
     stations = data.get("results", [])
 
     # Filter for Redwood City
@@ -99,24 +242,28 @@ def find_station():
     print(f"  Coverage: {station.get('mindate', 'N/A')} to {station.get('maxdate', 'N/A')}")
 
     # Save station info
-    station_info_file = DATA_DIR / "station_info.json"
-    with open(station_info_file, "w") as f:
+    with open(STATION_INFO_FILE, "w") as f:
         json.dump(station, f, indent=2)
-    print(f"Saved station info to {station_info_file}")
+    print(f"Saved station info to {STATION_INFO_FILE}")
 
     return station
 
 
-def fetch_data_for_type(station, datatype):
+def fetch_data_for_type(station, datatype, executor):
     """
     Fetch all daily data for a specific data type.
 
+    Yearly chunks already saved under CHUNK_DIR are reused, and every
+    newly completed chunk is saved there.
+
     Args:
         station: Station dict with id, mindate, maxdate
         datatype: Either "TMAX" or "TMIN"
+        executor: ThreadPoolExecutor that runs the page requests
 
     Returns:
-        list: All records for this datatype
+        (shards, missing): Parquet shards holding the records fetched for this
+        datatype, in date order, and the years of the chunks that failed
     """
     from datetime import datetime, timedelta
 
@@ -130,69 +277,88 @@ def fetch_data_for_type(station, datatype):
     start_dt = datetime.fromisoformat(start_date)
     end_dt = datetime.fromisoformat(end_date)
 
-    all_rows = []
-    page_num = 0
-
     # Fetch data in 1-year chunks to avoid API limits
+    chunks = []
     current_start = start_dt
-
     while current_start < end_dt:
         # Get data for 1 year at a time
         current_end = min(
             datetime(current_start.year + 1, 1, 1) - timedelta(days=1),
             end_dt
         )
-
-        chunk_start = current_start.date().isoformat()
-        chunk_end = current_end.date().isoformat()
-
-        offset = 1
-        while True:
-            params = {
-                "datasetid": "GHCND",
-                "stationid": station_id,
-                "startdate": chunk_start,
-                "enddate": chunk_end,
-                "datatypeid": datatype,
-                "limit": 1000,
-                "offset": offset,
-                "units": "metric",  # Get data in metric (tenths of °C)
-            }
-
-            try:
-                # Add rate limiting delay
-                time.sleep(REQUEST_DELAY)
-
-                r = requests.get(
-                    f"{BASE_URL}/data",
-                    headers=get_api_headers(),
-                    params=params,
-                    timeout=30
-                )
-                r.raise_for_status()
-            except requests.exceptions.RequestException as e:
-                # Silently skip failed chunks (might be no data for that period)
-                break
-
-            data = r.json()
-            results = data.get("results", [])
-
-            if not results:
-                break
-
-            # Cache raw response
-            page_file = PAGES_DIR / f"page_{datatype}_{page_num:06d}.json"
-            with open(page_file, "w") as f:
-                json.dump(data, f)
-
-            all_rows.extend(results)
-            page_num += 1
-            offset += 1000
+        chunks.append({
+            "datasetid": "GHCND",
+            "stationid": station_id,
+            "startdate": current_start.date().isoformat(),
+            "enddate": current_end.date().isoformat(),
+            "datatypeid": datatype,
+            "limit": PAGE_SIZE,
+            "units": "metric",  # Get data in metric (tenths of °C)
+        })
 
         # Move to next year
         current_start = datetime(current_start.year + 1, 1, 1)
 
-    return all_rows
+    def shard_path(params):
+        return CHUNK_DIR / f"{datatype}_{params['startdate']}.parquet"
+
+    # Only fetch chunks that an earlier, interrupted run didn't finish
+    todo = [params for params in chunks if not shard_path(params).exists()]
+    resuming = len(todo) < len(chunks)
+    if resuming:
+        _report(f"  Resuming {datatype}: {len(chunks) - len(todo)} of {len(chunks)} yearly chunks already fetched")
+
+    # Log this fetch's raw pages (appended to when resuming, so the log still
+    # covers every saved chunk)
+    page_log_file = DATA_DIR / PAGE_LOG_NAME.format(datatype=datatype)
+    page_log = io.BufferedWriter(
+        gzip.open(page_log_file, "ab" if resuming else "wb"),
+        buffer_size=PAGE_LOG_BUFFER,
+    )
+
+    CHUNK_DIR.mkdir(exist_ok=True)
+    pending = {}  # page future -> (chunk params, offset)
+    chunk_pages = {}  # chunk startdate -> (expected page count, {offset: page})
+
+    def request_page(params, offset):
+        future = executor.submit(_fetch_page, {**params, "offset": offset})
+        pending[future] = (params, offset)
+
+    with page_log:
+        # Request the first page of every chunk. When one arrives, its
+        # resultset count tells how many pages follow, and those are requested
+        # right away; each chunk is saved as soon as all of its pages are in
+        for params in todo:
+            request_page(params, 1)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                params, offset = pending.pop(future)
+                page = future.result()
+
+                if offset == 1:
+                    later_offsets = range(1 + PAGE_SIZE, _result_count(page) + 1, PAGE_SIZE)
+                    for later in later_offsets:
+                        request_page(params, later)
+                    chunk_pages[params["startdate"]] = (1 + len(later_offsets), {})
+
+                expected, pages = chunk_pages[params["startdate"]]
+                pages[offset] = page
+                if len(pages) == expected:
+                    del chunk_pages[params["startdate"]]
+                    _save_chunk([pages[o] for o in sorted(pages)], shard_path(params), page_log)
+
+    _report(f"  Saved raw API pages to {page_log_file}")
+
+    shards = [shard_path(params) for params in chunks if shard_path(params).exists()]
+    missing = [params["startdate"][:4] for params in chunks if not shard_path(params).exists()]
+    return shards, missing
+
+
+def _count_records(shards):
+    """Total record count of Parquet shards, from their footers."""
+    return sum(pq.read_metadata(shard).num_rows for shard in shards)
 
 
 def fetch_data(station):
@@ -209,35 +375,76 @@ def fetch_data(station):
 
     print(f"\nFetching data from {start_date} to {end_date}...")
 
-    # Fetch TMAX and TMIN separately
-    print("\nFetching TMAX (daily highs)...")
-    tmax_rows = fetch_data_for_type(station, "TMAX")
-    print(f"  Retrieved {len(tmax_rows):,} TMAX records")
-
-    print("\nFetching TMIN (daily lows)...")
-    tmin_rows = fetch_data_for_type(station, "TMIN")
-    print(f"  Retrieved {len(tmin_rows):,} TMIN records")
+    # Fetch TMAX and TMIN concurrently; their page requests share one worker
+    # pool and the rate limit
+    print("\nFetching TMAX (daily highs) and TMIN (daily lows)...")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pages:
+        with ThreadPoolExecutor(max_workers=2) as fetchers:
+            tmax_future = fetchers.submit(fetch_data_for_type, station, "TMAX", pages)
+            tmin_future = fetchers.submit(fetch_data_for_type, station, "TMIN", pages)
+        tmax_shards, tmax_missing = tmax_future.result()
+        tmin_shards, tmin_missing = tmin_future.result()
+    print(f"  Retrieved {_count_records(tmax_shards):,} TMAX records")
+    print(f"  Retrieved {_count_records(tmin_shards):,} TMIN records")
+
+    # Only consolidate a complete fetch; the saved chunks stay under CHUNK_DIR
+    # so the next run resumes with just the failed years
+    if tmax_missing or tmin_missing:
+        raise RuntimeError(
+            f"{len(tmax_missing) + len(tmin_missing)} yearly chunks failed "
+            f"(TMAX: {', '.join(tmax_missing) or 'none'}; "
+            f"TMIN: {', '.join(tmin_missing) or 'none'}). "
+            f"Run again to fetch them; completed chunks are kept in {CHUNK_DIR}"
+        )
 
-    all_rows = tmax_rows + tmin_rows
+    shards = tmax_shards + tmin_shards
+    total_records = _count_records(shards)
 
-    if not all_rows:
+    if total_records == 0:
         raise RuntimeError("No data retrieved from NOAA API")
 
-    print(f"\nTotal records fetched: {len(all_rows):,}")
+    print(f"\nTotal records fetched: {total_records:,}")
 
-    # Convert to DataFrame and save
-    df = pd.DataFrame(all_rows)
+    # Stream the yearly shards into the CSV and its typed Parquet copy one at
+    # a time, so the full record set is never held in memory. Both are written
+    # under temporary names and only moved into place once every shard is in,
+    # so an interrupted run never leaves a partial CSV that main() would take
+    # for a finished download
     output_file = DATA_DIR / "all_daily_raw.csv"
-    df.to_csv(output_file, index=False)
+    raw_parquet = output_file.with_suffix(".parquet")
+    partial_csv = output_file.with_name(output_file.name + ".part")
+    partial_parquet = raw_parquet.with_name(raw_parquet.name + ".part")
+    date_ranges = []
+    datatypes = []
+    with pq.ParquetWriter(partial_parquet, RAW_SCHEMA, compression="zstd") as writer:
+        for k, shard in enumerate(shards):
+            table = pq.read_table(shard)
+            table.to_pandas().to_csv(
+                partial_csv, mode="a" if k else "w", header=not k, index=False
+            )
+            writer.write_table(table.cast(RAW_SCHEMA))
+
+            # Running summary (ISO date strings order chronologically)
+            if table.num_rows:
+                date_ranges.append(pc.min_max(table["date"]).as_py())
+                for datatype in pc.unique(table["datatype"]).to_pylist():
+                    if datatype not in datatypes:
+                        datatypes.append(datatype)
+    partial_parquet.replace(raw_parquet)
+    partial_csv.replace(output_file)
     print(f"Saved raw data to {output_file}")
+    print(f"Saved raw data to {raw_parquet}")
+
+    # The consolidated CSV now holds everything; drop the resume shards
+    shutil.rmtree(CHUNK_DIR, ignore_errors=True)
 
     # Print summary
     print("\nData summary:")
-    print(f"  Date range: {df['date'].min()} to {df['date'].max()}")
-    print(f"  Data types: {df['datatype'].unique().tolist()}")
-    print(f"  Total records: {len(df):,}")
-
-    return df
+    first_date = min(dates["min"] for dates in date_ranges)
+    last_date = max(dates["max"] for dates in date_ranges)
+    print(f"  Date range: {first_date} to {last_date}")
+    print(f"  Data types: {datatypes}")
+    print(f"  Total records: {total_records:,}")
 
 
 def main():
@@ -254,7 +461,11 @@ def main():
         print("Delete this file to re-fetch data from NOAA")
 
         # Load and print summary
-        df = pd.read_csv(output_file)
+        # Only the summary columns, as Arrow-backed strings (the pyarrow engine
+        # would reparse the ISO dates as timestamps)
+        df = pd.read_csv(
+            output_file, usecols=["date", "datatype"], dtype_backend="pyarrow"
+        )
         print("\nExisting data summary:")
         print(f"  Total records: {len(df):,}")
         print(f"  Date range: {df['date'].min()} to {df['date'].max()}")
@@ -265,15 +476,11 @@ def main():
         print("=" * 70)
         return
 
-    # Check if we already have station info cached
-    station_info_file = DATA_DIR / "station_info.json"
-    if station_info_file.exists():
-        print(f"\nLoading cached station info from {station_info_file}")
-        with open(station_info_file) as f:
-            station = json.load(f)
-            print(f"Using station: {station['name']} ({station['id']})")
-    else:
-        station = find_station()
+    # The API token is sent with every request from here on
+    SESSION.headers.update(get_api_headers())
+
+    # Reuses the cached station search result while it is fresh
+    station = find_station()
 
     # Fetch the data
     fetch_data(station)
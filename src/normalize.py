@@ -3,26 +3,60 @@
 Normalize and structure temperature data for visualization.
 
 This script:
-1. Reads raw NOAA data CSV
+1. Reads raw NOAA data (Parquet copy, or the CSV)
 2. Converts temperatures to Fahrenheit
 3. Aligns data by day-of-year (removing Feb 29)
-4. Creates matrix CSVs suitable for visualization
+4. Creates matrix CSVs (plus Parquet copies) suitable for visualization
 5. Outputs a clean daily table
 """
 
+import os
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
 RAW_CSV = Path("data_raw/all_daily_raw.csv")
+RAW_PARQUET = RAW_CSV.with_suffix(".parquet")
 OUT_DIR = Path("data_processed")
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Column types of the daily_clean.parquet copy; the same schema the heat-trend
+# analysis caches from the CSV, so it can load this file directly
+DAILY_PARQUET_TYPES = {
+    "year": "int16",
+    "month": "int16",
+    "day": "int16",
+    "doy": "int16",
+    "datatype": "category",
+    "temp_f": "float32",
+    "temp_c": "float32",
+}
+
 
 def load_and_clean_data():
     """Load raw data and perform initial cleaning."""
     print("Loading raw data...")
-    df = pd.read_csv(RAW_CSV)
+    # Prefer the typed Parquet copy saved by fetch_noaa.py unless the CSV is
+    # newer; otherwise Arrow's multithreaded parser, with the dates parsed
+    # during the read using NOAA's fixed ISO format. Either way datatype is a
+    # category, so its filters compare small integer codes
+    if RAW_PARQUET.exists() and (
+        not RAW_CSV.exists() or RAW_PARQUET.stat().st_mtime >= RAW_CSV.stat().st_mtime
+    ):
+        df = pd.read_parquet(RAW_PARQUET)
+    else:
+        with open(RAW_CSV, "rb") as f:
+            # The file is read front to back; let the kernel read further ahead
+            # (the hint applies to this open file, so it is passed to the reader)
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            df = pd.read_csv(
+                f,
+                engine="pyarrow",
+                parse_dates=["date"],
+                date_format="%Y-%m-%dT%H:%M:%S",
+                dtype={"datatype": "category"},
+            )
 
     print(f"  Total records: {len(df):,}")
 
@@ -30,18 +64,24 @@ def load_and_clean_data():
     df = df[df["datatype"].isin(["TMAX", "TMIN"])]
     print(f"  Records after filtering to TMAX/TMIN: {len(df):,}")
 
-    # Convert date column to datetime
-    df["date"] = pd.to_datetime(df["date"])
-
-    # NOAA API with units=metric returns values in °C
+    # NOAA API with units=metric returns values in °C. The Fahrenheit column is
+    # computed in place in one array (same operation order, so same values)
     df["temp_c"] = df["value"]
-    df["temp_f"] = df["temp_c"] * 9.0 / 5.0 + 32.0
-
-    # Extract date components
-    df["year"] = df["date"].dt.year
-    df["month"] = df["date"].dt.month
-    df["day"] = df["date"].dt.day
-    df["doy"] = df["date"].dt.dayofyear
+    temp_f = df["value"].to_numpy(dtype=np.float64) * 9.0
+    temp_f /= 5.0
+    temp_f += 32.0
+    df["temp_f"] = temp_f
+
+    # Extract date components by datetime64 unit arithmetic on one day-resolution
+    # array, instead of four .dt accessor passes, in the smallest integer types
+    # that hold them
+    days = df["date"].to_numpy().astype("datetime64[D]")
+    year_start = days.astype("datetime64[Y]")
+    month_start = days.astype("datetime64[M]")
+    df["year"] = (year_start.astype(int) + 1970).astype("int16")
+    df["month"] = ((month_start - year_start).astype(int) + 1).astype("int8")
+    df["day"] = ((days - month_start).astype(int) + 1).astype("int8")
+    df["doy"] = ((days - year_start).astype(int) + 1).astype("int16")
 
     print(f"  Date range: {df['date'].min().date()} to {df['date'].max().date()}")
     print(f"  Year range: {df['year'].min()} to {df['year'].max()}")
@@ -61,13 +101,9 @@ def remove_leap_days(df):
     print(f"  Removed {removed} leap day records")
 
     # After removing Feb 29, we need to adjust DOY for dates after Feb 28 in leap years
-    # to ensure consistency (all years map to 1-365)
-    leap_years = df[df["date"].dt.is_leap_year]["year"].unique()
-
-    for year in leap_years:
-        # For leap years, shift DOY down by 1 for all dates after Feb 28
-        mask = (df["year"] == year) & (df["month"] > 2)
-        df.loc[mask, "doy"] = df.loc[mask, "doy"] - 1
+    # to ensure consistency (all years map to 1-365); one mask covers every leap year
+    after_leap_day = df["date"].dt.is_leap_year & (df["month"] > 2)
+    df.loc[after_leap_day, "doy"] -= 1
 
     return df
 
@@ -101,20 +137,24 @@ def create_matrices(df):
     """Create pivot tables (matrices) for TMAX and TMIN."""
     print("\nCreating temperature matrices...")
 
-    # Pivot to create matrices: rows = doy (1-365), columns = year
-    tmax = df[df["datatype"] == "TMAX"].pivot_table(
-        index="doy",
-        columns="year",
-        values="temp_f",
-        aggfunc="first"  # Use first value if there are duplicates
-    )
+    # Scatter into dense matrices: rows = doy (1-365), columns = year, over the
+    # days and years present for that datatype. Each (doy, year) should appear
+    # once; only the first non-missing record of any duplicates is stored, as
+    # with pivot_table's "first", which skips NaN
+    def to_matrix(datatype):
+        is_type = ((df["datatype"] == datatype) & df["temp_f"].notna()).to_numpy()
+        doys, row = np.unique(df["doy"].to_numpy()[is_type], return_inverse=True)
+        years, col = np.unique(df["year"].to_numpy()[is_type], return_inverse=True)
+        cell = row * years.size + col
+        cell, first = np.unique(cell, return_index=True)
+        matrix = np.full((doys.size, years.size), np.nan)
+        matrix.flat[cell] = df["temp_f"].to_numpy()[is_type][first]
+        return pd.DataFrame(
+            matrix, index=pd.Index(doys, name="doy"), columns=pd.Index(years, name="year")
+        )
 
-    tmin = df[df["datatype"] == "TMIN"].pivot_table(
-        index="doy",
-        columns="year",
-        values="temp_f",
-        aggfunc="first"
-    )
+    tmax = to_matrix("TMAX")
+    tmin = to_matrix("TMIN")
 
     print(f"  TMAX matrix: {tmax.shape[0]} days × {tmax.shape[1]} years")
     print(f"  TMIN matrix: {tmin.shape[0]} days × {tmin.shape[1]} years")
@@ -133,18 +173,25 @@ def save_outputs(df, tmax, tmin):
     """Save all processed data files."""
     print("\nSaving processed data...")
 
-    # Save clean daily table
+    # Save clean daily table, plus its Parquet copy
     daily_cols = ["date", "year", "month", "day", "doy", "datatype", "temp_f", "temp_c"]
     daily_file = OUT_DIR / "daily_clean.csv"
     df[daily_cols].to_csv(daily_file, index=False)
+    df[daily_cols].astype(DAILY_PARQUET_TYPES).to_parquet(
+        daily_file.with_suffix(".parquet"), engine="pyarrow", compression="zstd", index=False
+    )
     print(f"  Saved daily data: {daily_file}")
 
-    # Save matrices
+    # Save matrices, each as CSV plus a binary Parquet copy for visualize.py
+    # (Parquet column names must be strings)
     tmax_file = OUT_DIR / "tmax_matrix.csv"
     tmin_file = OUT_DIR / "tmin_matrix.csv"
 
-    tmax.to_csv(tmax_file)
-    tmin.to_csv(tmin_file)
+    for matrix, matrix_file in [(tmax, tmax_file), (tmin, tmin_file)]:
+        matrix.to_csv(matrix_file)
+        matrix.rename(columns=str).to_parquet(
+            matrix_file.with_suffix(".parquet"), engine="pyarrow", compression="zstd"
+        )
 
     print(f"  Saved TMAX matrix: {tmax_file}")
     print(f"  Saved TMIN matrix: {tmin_file}")
@@ -178,7 +225,7 @@ def main():
     print("Temperature Data Normalization")
     print("=" * 70)
 
-    if not RAW_CSV.exists():
+    if not RAW_CSV.exists() and not RAW_PARQUET.exists():
         raise FileNotFoundError(
             f"Raw data file not found: {RAW_CSV}\n"
             "Please run fetch_noaa.py first to download the data."